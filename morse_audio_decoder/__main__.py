@@ -26,12 +26,26 @@ def main(argv: list[str] = None) -> None:
 
     try:
         decoded = MorseCode.from_wavfile(file).decode()
-        sys.stdout.write(decoded + "\n")
+        _write_stdout(decoded)
     except UserWarning as err:
         sys.stderr.write(f"{err}\n")
         sys.exit(1)
 
 
+def _write_stdout(text: str) -> None:
+    """Write line of text to standard output
+
+    Text and newline are written separately, so that the decoded message is
+    not copied to append the newline. Writing through the text layer keeps
+    platform newline translation.
+
+    Args:
+        text (str): Line content, without newline
+    """
+    sys.stdout.write(text)
+    sys.stdout.write("\n")
+
+
 def _parse_args(args: list[str]) -> argparse.Namespace:
     """Parse arguments from command line"""
     parser = argparse.ArgumentParser(
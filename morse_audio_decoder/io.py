@@ -1,10 +1,51 @@
 """Input/output"""
 
 import os
+import struct
+from typing import NamedTuple
 import wave
 
 import numpy as np
 
+# RIFF header with 16 byte PCM "fmt " chunk, directly followed by "data" chunk
+_CANONICAL_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+_WAVE_FORMAT_PCM = 1
+
+
+class _CanonicalHeader(NamedTuple):
+
+    """Fields of canonical 44 byte WAV header
+
+    Attributes:
+        riff_id (bytes): Chunk ID, b"RIFF"
+        riff_size (int): Size of file after this field, bytes
+        wave_id (bytes): RIFF format, b"WAVE"
+        fmt_id (bytes): Subchunk ID, b"fmt "
+        fmt_size (int): Size of "fmt " subchunk, 16 for PCM
+        audio_format (int): Audio format, 1 for PCM
+        n_channels (int): Number of channels
+        sample_rate (int): Sample rate, Hz
+        byte_rate (int): Bytes per second
+        block_align (int): Bytes per frame, for all channels
+        sample_width_bits (int): Bits per sample
+        data_id (bytes): Subchunk ID, b"data"
+        data_size (int): Size of sample data, bytes
+    """
+
+    riff_id: bytes
+    riff_size: int
+    wave_id: bytes
+    fmt_id: bytes
+    fmt_size: int
+    audio_format: int
+    n_channels: int
+    sample_rate: int
+    byte_rate: int
+    block_align: int
+    sample_width_bits: int
+    data_id: bytes
+    data_size: int
+
 
 def read_wave(file: os.PathLike) -> tuple[int, np.ndarray]:
     """Read WAV file into numpy array
@@ -12,6 +53,10 @@ def read_wave(file: os.PathLike) -> tuple[int, np.ndarray]:
     NOTE: only mono audio is supported. Multi-channel audio is interlaced,
     and would need to be de-interlaced into a 2D array.
 
+    Files with canonical 44 byte header are memory mapped, so that samples are
+    not copied in memory, but paged in from disk when they are processed.
+    Other files are read with the `wave` module.
+
     Args:
         file (os.PathLike): input WAV file
 
@@ -21,6 +66,10 @@ def read_wave(file: os.PathLike) -> tuple[int, np.ndarray]:
         Data type is determined from the file; for 16bit PCM (as in competition),
         the output data type is int16. For mono audio, return shape is 1D array.
     """
+    mapped = _memmap_canonical_wave(file)
+    if mapped is not None:
+        return mapped
+
     with wave.open(str(file), "rb") as wav_file:
         buffer = wav_file.readframes(wav_file.getnframes())
         sample_width_bits = wav_file.getsampwidth() * 8
@@ -32,3 +81,48 @@ def read_wave(file: os.PathLike) -> tuple[int, np.ndarray]:
                 + str(wav_file.getnchannels())
             )
         return wav_file.getframerate(), data
+
+
+def _memmap_canonical_wave(file: os.PathLike) -> tuple[int, np.ndarray] | None:
+    """Memory map mono PCM WAV file with canonical 44 byte header
+
+    Args:
+        file (os.PathLike): input WAV file
+
+    Returns:
+        tuple[int, np.ndarray] | None: sample rate, data. None, if the file
+            does not have canonical header, is not mono PCM, or has no samples.
+    """
+    with open(file, "rb") as wav_file:
+        header_bytes = wav_file.read(_CANONICAL_HEADER.size)
+        file_size = os.fstat(wav_file.fileno()).st_size
+    if len(header_bytes) < _CANONICAL_HEADER.size:
+        return None
+
+    header = _CanonicalHeader._make(_CANONICAL_HEADER.unpack(header_bytes))
+    if (
+        (header.riff_id, header.wave_id, header.fmt_id, header.data_id)
+        != (b"RIFF", b"WAVE", b"fmt ", b"data")
+        or header.fmt_size != 16
+        or header.audio_format != _WAVE_FORMAT_PCM
+        or header.n_channels != 1
+        or header.sample_width_bits not in (8, 16, 32)
+    ):
+        return None
+
+    # Streaming writers may leave data size unset or too large
+    data_size = min(header.data_size, file_size - _CANONICAL_HEADER.size)
+    n_samples = data_size // (header.sample_width_bits // 8)
+    if n_samples == 0:
+        return None
+
+    sample_width_bits = header.sample_width_bits
+    _dtype = "uint8" if sample_width_bits == 8 else f"int{sample_width_bits}"
+    data = np.memmap(
+        file,
+        dtype=_dtype,
+        mode="r",
+        offset=_CANONICAL_HEADER.size,
+        shape=(n_samples,),
+    )
+    return header.sample_rate, data
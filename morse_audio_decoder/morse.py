@@ -1,17 +1,78 @@
 """Morse code handling"""
 
 from configparser import ConfigParser
+from itertools import pairwise
 import os
 from pathlib import Path
 import sys
-import warnings
+from typing import NamedTuple
 
 import numpy as np
-import sklearn.cluster
-import sklearn.exceptions
 
 from .io import read_wave
-from .processing import smoothed_power, squared_signal
+from .processing import envelope_and_threshold
+
+
+def _read_morse_to_char() -> dict[str, str]:
+    """Read morse to character mappings from morse.ini
+
+    Returns:
+        dict[str, str]: Mapping of morse character string to letter
+    """
+    config = ConfigParser()
+    config.read(Path(__file__).parent / "morse.ini")
+    chars = config["characters"]
+    return {chars[key]: key.upper() for key in chars}
+
+
+_MORSE_TO_CHAR = _read_morse_to_char()
+
+
+class _Clustering(NamedTuple):
+
+    """Result of one-dimensional clustering
+
+    Attributes:
+        labels (np.ndarray): Cluster label of each input value
+        centers (np.ndarray): Mean of values in each cluster, in ascending order
+    """
+
+    labels: np.ndarray
+    centers: np.ndarray
+
+
+def _split_1d(values: np.ndarray, n_clusters: int) -> _Clustering:
+    """Split one-dimensional values into clusters at largest gaps
+
+    Values are sorted, and the sorted array is cut at the `n_clusters - 1`
+    largest gaps between consecutive values. Only gaps with non-zero width are
+    cut, so fewer clusters are returned, if there are not enough distinct
+    values.
+
+    Args:
+        values (np.ndarray): 1D array of values to be clustered
+        n_clusters (int): Maximum number of clusters
+
+    Returns:
+        _Clustering: labels and centers, where labels are numbered in ascending
+            order of cluster center
+    """
+    sorted_values = np.sort(values)
+    gaps = np.diff(sorted_values)
+    n_cuts = min(n_clusters - 1, np.count_nonzero(gaps))
+
+    if n_cuts > 0:
+        cut_idx = np.sort(np.argpartition(gaps, -n_cuts)[-n_cuts:]) + 1
+    else:
+        cut_idx = np.array([], dtype="int")
+
+    labels = np.searchsorted(sorted_values[cut_idx], values, side="right")
+
+    start_idx = np.concatenate(([0], cut_idx))
+    cluster_sizes = np.diff(np.append(start_idx, len(values)))
+    centers = np.add.reduceat(sorted_values, start_idx) / cluster_sizes
+
+    return _Clustering(labels, centers)
 
 
 class MorseCode:
@@ -22,8 +83,6 @@ class MorseCode:
         data (np.ndarray): 1D binary array, representing morse code in time
     """
 
-    _morse_to_char: dict = None
-
     def __init__(self, data: np.ndarray, sample_rate: int = None):
         """Initialize code with binary data
 
@@ -39,21 +98,25 @@ class MorseCode:
         """Construct from wave file
 
         - Read in wave file
-        - Calculate signal envelope (smoothing of 0.1 seconds)
+        - Calculate signal envelope (Hann window of 0.01 seconds)
         - Apply squaring (threshold: 50% of max smoothed data value)
 
+        The last two steps are performed together in `envelope_and_threshold`.
+        Rectangular window is not used here: its envelope ripples where the
+        tone fades out, and the ripple can cross the threshold more than once.
+
         Args:
             file (os.PathLike): path to input WAV file
 
         Returns:
-            MorseCode: class instance, with 1D binary input data
+            MorseCode: class instance, with 1D binary input data and
+                sample rate of the file
         """
         sample_rate, wave = read_wave(file)
         window_size = int(0.01 * sample_rate)
-        envelope = smoothed_power(wave, window_size)
-        square_data = squared_signal(envelope)
+        square_data = envelope_and_threshold(wave, window_size, window="hann")
 
-        return cls(square_data)
+        return cls(square_data, sample_rate)
 
     def decode(self) -> str:
         """Decode data
@@ -71,24 +134,15 @@ class MorseCode:
         return self._translate(morse_words)
 
     @classmethod
-    @property
     def morse_to_char(cls) -> dict[str, str]:
         """Morse to character dictionary
 
-        Read mappings from morse.ini and store them to class variable. Later,
-        return directly from this class variable.
+        Mappings are read from morse.ini once, when this module is imported.
 
         Returns:
             dict[str, str]: Mapping of morse character string to letter
         """
-        if cls._morse_to_char is not None:
-            return cls._morse_to_char
-
-        config = ConfigParser()
-        config.read(Path(__file__).parent / "morse.ini")
-        chars = config["characters"]
-        cls._morse_to_char = {chars[key]: key.upper() for key in chars}
-        return cls._morse_to_char
+        return _MORSE_TO_CHAR
 
     def _on_off_samples(self) -> tuple[np.ndarray, np.ndarray]:
         """Calculate signal ON/OFF durations
@@ -103,21 +157,28 @@ class MorseCode:
         """
         if len(self.data) == 0:
             return np.array([], dtype="int"), np.array([], dtype="int")
-        square_diff = np.diff(self.data)
+        data = self.data
 
-        rising_idx = np.nonzero(square_diff == 1)[0]
-        falling_idx = np.nonzero(square_diff == -1)[0]
+        # Any change between consecutive samples is an edge, so rising and
+        # falling edges alternate. Boolean mask is one byte per sample, and
+        # np.flatnonzero has a vectorized fast path for it, unlike for integers.
+        edge_idx = np.flatnonzero(np.not_equal(data[1:], data[:-1]))
 
         # Case: data starts with ON - it started one sample before index 0
-        if falling_idx[0] < rising_idx[0]:
-            rising_idx = np.insert(rising_idx, 0, -1)
-
+        starts_on = int(bool(data[0]))
         # Case: data ends with ON
-        if rising_idx[-1] > falling_idx[-1]:
-            falling_idx = np.insert(falling_idx, len(falling_idx), len(self.data) - 1)
+        ends_on = int(bool(data[-1]))
+
+        # Edges interleaved as rising, falling, rising, falling, ...
+        edges = np.empty(len(edge_idx) + starts_on + ends_on, dtype=np.intp)
+        edges[:starts_on] = -1
+        edges[starts_on : len(edges) - ends_on] = edge_idx
+        edges[len(edges) - ends_on :] = len(data) - 1
 
-        on_samples = falling_idx - rising_idx
-        off_samples = rising_idx[1:] - falling_idx[: len(falling_idx) - 1]
+        # Period lengths alternate between ON and OFF
+        period_samples = np.diff(edges)
+        on_samples = period_samples[0::2]
+        off_samples = period_samples[1::2]
 
         return on_samples, off_samples
 
@@ -140,21 +201,13 @@ class MorseCode:
                 no guess can be made on dash/dot.
 
         Returns:
-            np.ndarray: array of dashes and dots, of object (string) type
+            np.ndarray: array of dashes and dots, of single character string
+                ('<U1') type
         """
         if len(on_samples) == 0:
             return np.array([], dtype="str")
-        n_clusters = min(2, len(on_samples))
-
-        column_vec = on_samples.reshape(-1, 1)
-
-        # Suppress ConvergenceWarning on too low distinct clusters; fix it later
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            clustering = sklearn.cluster.KMeans(
-                n_clusters=n_clusters, random_state=0
-            ).fit(column_vec)
-        distinct_clusters = len(set(clustering.labels_))
+        clustering = _split_1d(on_samples, 2)
+        distinct_clusters = len(clustering.centers)
 
         # It is not clear whether dash or dot -- use (20 wpm dot length) * 1.5 as limit
         if distinct_clusters == 1:
@@ -162,21 +215,17 @@ class MorseCode:
                 raise UserWarning("Cannot determine whether dash or dot")
             sys.stderr.write("WARNING: too little data, guessing based on 20 wpm")
 
-            sample_length = clustering.cluster_centers_[0]
+            sample_length = clustering.centers[0]
             is_dot = sample_length / (self.sample_rate * 60 / 1000) < 1.5
-            dot_label = 0 if is_dot else 1
             dash_label = 1 if is_dot else 0
         else:
-            cluster_sort_idx = np.argsort(
-                clustering.cluster_centers_.flatten()
-            ).tolist()
-            dot_label = cluster_sort_idx.index(0)
-            dash_label = cluster_sort_idx.index(1)
+            # Labels are in ascending order of ON period length
+            dash_label = 1
 
-        dash_dot_map = {dot_label: ".", dash_label: "-"}
-        dash_dot_characters = np.vectorize(dash_dot_map.get)(clustering.labels_)
+        dash_dot_lut = np.array([".", "-"], dtype="<U1")
+        is_dash = clustering.labels == dash_label
 
-        return dash_dot_characters
+        return dash_dot_lut[is_dash.astype(np.intp)]
 
     @staticmethod
     def _break_spaces(off_samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
@@ -200,31 +249,22 @@ class MorseCode:
         """
         if len(off_samples) == 0:
             return np.array([], dtype="int"), np.array([], dtype="int")
-        n_clusters = min(3, len(off_samples))
+        clustering = _split_1d(off_samples, 3)
+        distinct_clusters = len(clustering.centers)
 
-        column_vec = off_samples.reshape(-1, 1)
-
-        # Suppress ConvergenceWarning on too low distinct clusters; fix it later
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            clustering = sklearn.cluster.KMeans(
-                n_clusters=n_clusters, random_state=0
-            ).fit(column_vec)
-        distinct_clusters = len(set(clustering.labels_))
-
-        cluster_sort_idx = np.argsort(clustering.cluster_centers_.flatten()).tolist()
+        # Labels are in ascending order of OFF period length
+        intra_space_label = 0
+        word_space_label = 2
 
         # This index breaks dashes/dots into characters
-        intra_space_label = cluster_sort_idx.index(0)
-        char_break_idx = np.nonzero(clustering.labels_ != intra_space_label)[0] + 1
+        char_break_idx = np.nonzero(clustering.labels != intra_space_label)[0] + 1
 
-        char_or_word_space_arr = clustering.labels_[
-            clustering.labels_ != intra_space_label
+        char_or_word_space_arr = clustering.labels[
+            clustering.labels != intra_space_label
         ]
 
         # This index breaks character list into word lists
         if distinct_clusters == 3:
-            word_space_label = cluster_sort_idx.index(2)
             word_space_idx = (
                 np.nonzero(char_or_word_space_arr == word_space_label)[0] + 1
             )
@@ -255,18 +295,14 @@ class MorseCode:
             list[list[str]]: Words in morse code. A single word is a list of
                 dash-dot character combinations.
         """
+        # Join once to a single string, then break it to characters by slicing
+        dash_dot_str = raw_dash_dot.astype("S1").tobytes().decode("ascii")
 
-        char_start_idx = [0] + (char_break_idx).tolist()
-        char_end_idx = (char_break_idx).tolist() + [len(raw_dash_dot)]
-        morse_characters = [
-            "".join(raw_dash_dot[i:j].tolist())
-            for i, j in zip(char_start_idx, char_end_idx)
-        ]
-
-        word_start_idx = [0] + (word_space_idx).tolist()
-        word_end_idx = (word_space_idx).tolist() + [len(morse_characters)]
+        char_bounds = [0, *char_break_idx.tolist(), len(dash_dot_str)]
+        morse_characters = [dash_dot_str[i:j] for i, j in pairwise(char_bounds)]
 
-        return [morse_characters[i:j] for i, j in zip(word_start_idx, word_end_idx)]
+        word_bounds = [0, *word_space_idx.tolist(), len(morse_characters)]
+        return [morse_characters[i:j] for i, j in pairwise(word_bounds)]
 
     def _translate(self, morse_words: list[list[str]]) -> str:
         """Translate list of morse-coded words to string
@@ -278,6 +314,7 @@ class MorseCode:
         Returns:
             str: Message contained in input
         """
-        char_dict = self.morse_to_char
-        char_lists = [[char_dict.get(j, "") for j in i] for i in morse_words]
-        return " ".join(["".join(word) for word in char_lists])
+        get_char = self.morse_to_char().get
+        return " ".join(
+            "".join([get_char(char, "") for char in word]) for word in morse_words
+        )
@@ -1,44 +1,398 @@
 """Audio signal processing"""
 
+from collections.abc import Iterator
+from functools import lru_cache
+
 import numpy as np
+import scipy.fft
+import scipy.signal
 
 
-def smoothed_power(
-    data: np.ndarray, window_size: int, mode: str = "valid"
+def smoothed_power(  # pylint: disable=too-many-arguments
+    data: np.ndarray,
+    window_size: int,
+    mode: str = "valid",
+    window: str = "hann",
+    *,
+    out: np.ndarray = None,
+    workers: int = None,
 ) -> np.ndarray:
     """Calculate moving time window RMS power for a signal
 
     Produce amplitude envelope, which reperesents signal power over time.
     Power is calculated as RMS (root mean squared) value.
-    The envelope is smoothed by Hann window convolution.
+    With Hann window, the envelope is smoothed by convolution, which is
+    calculated with FFT-based overlap-add method. With rectangular (boxcar)
+    window, plain moving average is calculated from cumulative sums in O(N).
 
     Args:
-        data (np.ndarray): Input data
+        data (np.ndarray): Input data, 1D array. Non-contiguous input (such as
+            a strided view) is copied once to C-contiguous float32 array.
         window_size (int): Smoothing window length, samples
-        mode (str): Convolution mode, one of  "same" and "valid".
+        mode (str): Convolution mode, one of "full", "same" and "valid".
             When "same", return same length array as in input; when "valid",
             convolution is only given for signal points that fully overlap with
-            the smoothing window. See np.convolve documentation
-            for further explanation.
+            the smoothing window. See scipy.signal.oaconvolve documentation
+            for further explanation. "full" mode is only available with Hann
+            window.
+        window (str): Smoothing window type, one of "hann" and "boxcar".
+            Defaults to "hann".
+        out (np.ndarray, optional): Preallocated float32 array of output
+            length, where the result is written. Defaults to None, when the
+            result is written over the smoothed mean square array.
+        workers (int, optional): Number of threads for FFT-based convolution,
+            negative values count from the number of CPU cores, as in
+            scipy.fft. Defaults to None, when scipy.fft default is used.
 
     Returns:
-        np.ndarray: smoothed array
+        np.ndarray: smoothed array, float32 dtype
+
+    Raises:
+        ValueError: if convolution mode or window type is not recognized, or
+            window size is smaller than 1
     """
-    # Convert data in order to avoid truncation errors
-    if data.dtype == np.uint8:
-        secure_data = data.astype(np.int16) - 128
-    elif np.issubdtype(data.dtype, np.integer):
-        secure_data = data.astype(np.int32) if data.itemsize < 32 else data
+    _check_mode(mode, window)
+    _check_window_size(window_size)
+
+    squared = _secure_data(data)
+    np.square(squared, out=squared)
+
+    if window == "boxcar":
+        averaged = _moving_average(squared, window_size, mode)
+    elif window == "hann":
+        averaged = _hann_convolve(squared, window_size, mode, workers)
     else:
-        secure_data = data.astype(np.float32) if data.itemsize < 32 else data
+        raise ValueError(f"Unknown window type: {window}")
+
+    if out is None:
+        out = averaged
+    return _root(averaged, out=out)
+
+
+def smoothed_power_batch(
+    data: np.ndarray, window_size: int, mode: str = "valid", workers: int = None
+) -> np.ndarray:
+    """Calculate moving time window RMS power for multiple signals at once
+
+    Same as `smoothed_power` with Hann window, applied to each row of a 2D
+    array. All rows are convolved in a single call, which avoids per-signal
+    overhead when there are many short signals of equal length.
+
+    Args:
+        data (np.ndarray): Input data, 2D array with one signal on each row
+        window_size (int): Smoothing window length, samples
+        mode (str): Convolution mode, one of  "same" and "valid".
+            See `smoothed_power`.
+        workers (int, optional): Number of threads for FFT-based convolution.
+            See `smoothed_power`.
+
+    Returns:
+        np.ndarray: smoothed 2D array, float32 dtype
+
+    Raises:
+        ValueError: if data is not a 2D array, convolution mode is not
+            recognized, or window size is smaller than 1
+    """
+    if data.ndim != 2:
+        raise ValueError(f"Expected 2D array, found {data.ndim}D")
+    _check_mode(mode)
+    _check_window_size(window_size)
+
+    squared = _secure_data(data)
+    np.square(squared, out=squared)
+
+    averaged = _hann_convolve(squared, window_size, mode, workers)
+    return _root(averaged, out=averaged)
+
+
+def envelope_and_threshold(
+    data: np.ndarray,
+    window_size: int,
+    window: str = "hann",
+    block_size: int = 2**18,
+) -> np.ndarray:
+    """Convert signal to binary 0/1 by thresholding its RMS envelope
+
+    Equivalent to `squared_signal(smoothed_power(data, window_size,
+    window=window))`, but calculated in fewer passes over the data. Square
+    root is monotonic, so RMS threshold of 0.5 * max(envelope) is applied as
+    threshold of 0.25 * max(mean square) without ever taking the square root.
+
+    The signal is processed in overlapping blocks, so that temporary arrays
+    stay small enough for CPU cache, and a memory mapped input is read
+    sequentially, only once. Mean square of each block is stored in float32
+    array, which is thresholded when the envelope maximum is known.
+
+    Args:
+        data (np.ndarray): Input data, 1D array. Non-contiguous input (such as
+            a strided view) is copied to C-contiguous float32 array, one block
+            at a time.
+        window_size (int): Smoothing window length, samples
+        window (str): Smoothing window type, one of "hann" and "boxcar".
+            Defaults to "hann". See `smoothed_power`.
+        block_size (int): Number of output samples calculated at a time.
+            Defaults to 2**18.
+
+    Returns:
+        np.ndarray: Binary array of uint8 dtype, for signal points that fully
+            overlap with the smoothing window (as in "valid" convolution)
+
+    Raises:
+        ValueError: if window type is not recognized, or window size is smaller
+            than 1
+    """
+    if window not in ("hann", "boxcar"):
+        raise ValueError(f"Unknown window type: {window}")
+    _check_window_size(window_size)
+
+    output_size = len(data) - window_size + 1
+    if output_size <= 0:
+        return np.array([], dtype=np.uint8)
+
+    mean_square = np.empty(output_size, dtype=np.float32)
+    for start, block in _mean_square_blocks(data, window_size, window, block_size):
+        mean_square[start : start + len(block)] = block
+    threshold = 0.25 * np.max(mean_square)
+
+    square_data = np.empty(output_size, dtype=np.uint8)
+    np.greater(mean_square, threshold, out=square_data.view(bool))
+    return square_data
+
+
+def _mean_square_blocks(
+    data: np.ndarray, window_size: int, window: str, block_size: int
+) -> Iterator[tuple[int, np.ndarray]]:
+    """Calculate moving mean square in blocks
+
+    Consecutive input blocks overlap by `window_size - 1` samples, so that
+    concatenated output blocks are equal to "valid" mode convolution of the
+    whole signal. Working buffers are allocated once, only for the selected
+    window type, and reused for every block, so the yielded array may be
+    overwritten when the next block is calculated.
+
+    Args:
+        data (np.ndarray): Input data
+        window_size (int): Smoothing window length, samples
+        window (str): Smoothing window type, one of "hann" and "boxcar"
+        block_size (int): Number of output samples in one block
+
+    Yields:
+        tuple[int, np.ndarray]: start index of block in output, and moving
+            mean square of the block
+    """
+    output_size = len(data) - window_size + 1
+    squared_buffer = np.empty(block_size + window_size - 1, dtype=np.float32)
+    if window == "boxcar":
+        cumulative_buffer = np.empty(block_size + window_size, dtype=np.float64)
+        average_buffer = np.empty(block_size, dtype=np.float32)
+
+    for start in range(0, output_size, block_size):
+        stop = min(start + block_size, output_size)
+        block = data[start : stop + window_size - 1]
+        squared = _secure_data(block, out=squared_buffer[: len(block)])
+        np.square(squared, out=squared)
+        if window == "hann":
+            yield start, _hann_convolve(squared, window_size, "valid")
+        else:
+            yield start, _moving_average(
+                squared,
+                window_size,
+                "valid",
+                cumulative=cumulative_buffer,
+                out=average_buffer[: stop - start],
+            )
+
+
+def _check_mode(mode: str, window: str = "hann") -> None:
+    """Check that convolution mode is supported for the window type
+
+    Args:
+        mode (str): Convolution mode
+        window (str): Smoothing window type. Defaults to "hann".
+
+    Raises:
+        ValueError: if mode is not one of "full", "same" and "valid", or
+            if mode is "full" with other than Hann window
+    """
+    modes = ("full", "same", "valid") if window == "hann" else ("same", "valid")
+    if mode not in modes:
+        raise ValueError(f"Unknown convolution mode for {window} window: {mode}")
+
+
+def _check_window_size(window_size: int) -> None:
+    """Check that smoothing window has at least one sample
+
+    Args:
+        window_size (int): Smoothing window length, samples
+
+    Raises:
+        ValueError: if window size is smaller than 1
+    """
+    if window_size < 1:
+        raise ValueError(f"Window size must be at least 1, found {window_size}")
+
+
+def _root(mean_square: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Take square root of mean square, to get RMS value
+
+    Args:
+        mean_square (np.ndarray): Moving mean square, modified in place
+        out (np.ndarray): Array of same shape, where the result is written.
+            May be the same array as mean_square.
+
+    Returns:
+        np.ndarray: RMS value, written in out
+    """
+    # Round-off may produce tiny negative values where the signal is silent
+    np.clip(mean_square, 0, None, out=mean_square)
+    return np.sqrt(mean_square, out=out)
+
+
+def _hann_convolve(
+    data: np.ndarray, window_size: int, mode: str, workers: int = None
+) -> np.ndarray:
+    """Convolve along last axis with normalized Hann window
+
+    Args:
+        data (np.ndarray): Input data, 1D or 2D array
+        window_size (int): Smoothing window length, samples
+        mode (str): Convolution mode, one of  "same" and "valid".
+            See `smoothed_power`.
+        workers (int, optional): Number of threads for FFT-based convolution.
+            See `smoothed_power`.
+
+    Returns:
+        np.ndarray: convolved array, float32 dtype
+    """
+    hann = _normalized_hanning(window_size)
+    hann = hann.reshape((1,) * (data.ndim - 1) + (window_size,))
+    return _fft_convolve(data, hann, mode, workers)
+
+
+def _fft_convolve(
+    data: np.ndarray, window: np.ndarray, mode: str, workers: int = None
+) -> np.ndarray:
+    """Convolve along last axis with FFT-based overlap-add method
+
+    Args:
+        data (np.ndarray): Input data
+        window (np.ndarray): Convolution window, with same number of
+            dimensions as data
+        mode (str): Convolution mode, one of  "same" and "valid".
+            See scipy.signal.oaconvolve documentation.
+        workers (int, optional): Number of threads for block FFTs.
+            Defaults to None, when scipy.fft default is used.
+
+    Returns:
+        np.ndarray: convolved array
+    """
+    if workers is None:
+        return scipy.signal.oaconvolve(data, window, mode=mode, axes=-1)
+    with scipy.fft.set_workers(workers):
+        return scipy.signal.oaconvolve(data, window, mode=mode, axes=-1)
+
+
+@lru_cache(maxsize=8)
+def _normalized_hanning(window_size: int) -> np.ndarray:
+    """Create Hann window with integral=1
 
-    # Create window with integral=1 -> multiplication results in weighted average
+    Multiplication with the window results in weighted average. Windows are
+    cached by size, and returned as read-only arrays.
+
+    Args:
+        window_size (int): Window length, samples
+
+    Returns:
+        np.ndarray: Read-only float32 window
+    """
     window = np.hanning(window_size)
-    window = window / sum(window)
+    window = (window / np.sum(window)).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+
+def _secure_data(data: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Convert data to float32, in order to avoid truncation errors when squaring
+
+    Always return a new (or the given) C-contiguous array, so that it can be
+    modified in place and later processing is not slowed down by strided
+    memory access.
 
-    squared = np.power(secure_data, 2)
+    Args:
+        data (np.ndarray): Input data
+        out (np.ndarray, optional): Preallocated C-contiguous float32 array of
+            same shape as data, where the result is written. Defaults to None,
+            when a new array is allocated.
+
+    Returns:
+        np.ndarray: Signed float32 data
+    """
+    if out is None:
+        secure_data = np.array(data, dtype=np.float32, order="C")
+    else:
+        secure_data = out
+        np.copyto(secure_data, data, casting="same_kind")
+    if data.dtype == np.uint8:
+        np.subtract(secure_data, 128, out=secure_data)
+    return secure_data
+
+
+def _moving_average(
+    data: np.ndarray,
+    window_size: int,
+    mode: str,
+    cumulative: np.ndarray = None,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Calculate rectangular window moving average with cumulative sums
+
+    Each window sum is the difference of two cumulative sums, so the cost
+    does not depend on the window size. Cumulative sums are kept in float64
+    for precision, but the differences are small enough for float32.
+
+    Args:
+        data (np.ndarray): Input data
+        window_size (int): Averaging window length, samples
+        mode (str): Convolution mode, one of  "same" and "valid".
+            See `smoothed_power`.
+        cumulative (np.ndarray, optional): Preallocated float64 scratch array
+            with length of at least `len(data) + 1`. Defaults to None, when
+            a new array is allocated.
+        out (np.ndarray, optional): Preallocated float32 array of output
+            length, where the result is written. Defaults to None, when
+            a new array is allocated.
+
+    Returns:
+        np.ndarray: moving average, float32 array
+    """
+    if cumulative is None:
+        cumulative = np.empty(len(data) + 1, dtype=np.float64)
+    cumulative = cumulative[: len(data) + 1]
+    cumulative[0] = 0
+    np.cumsum(data, dtype=np.float64, out=cumulative[1:])
+
+    if mode == "same":
+        # Zero-padded convolution: cumulative sum is 0 before the signal, and
+        # equal to the total after it. Edge padding repeats cumulative[0] == 0
+        # and cumulative[-1], centered as in scipy.signal.convolve.
+        cumulative = np.pad(
+            cumulative, (window_size // 2, (window_size - 1) // 2), mode="edge"
+        )
+
+    if mode == "valid" and window_size > len(data):
+        # Roles of data and window are swapped, as in scipy.signal.oaconvolve,
+        # so every output point averages the whole data
+        upper = np.broadcast_to(cumulative[-1:], (window_size - len(data) + 1,))
+        lower = cumulative[:1]
+    else:
+        upper = cumulative[window_size:]
+        lower = cumulative[:-window_size]
 
-    return np.sqrt(np.convolve(squared, window, mode)).astype(data.dtype)
+    if out is None:
+        out = np.empty(len(upper), dtype=np.float32)
+    np.subtract(upper, lower, out=out)
+    out *= 1.0 / window_size
+    return out
 
 
 def squared_signal(data: np.ndarray, threshold: int | float = None) -> np.ndarray:
@@ -54,4 +408,4 @@ def squared_signal(data: np.ndarray, threshold: int | float = None) -> np.ndarra
         np.ndarray: Binary array of int8 dtype, same shape as original
     """
     threshold = threshold or 0.5 * np.max(data)
-    return np.where(data > threshold, 1, 0).astype(np.int8)
+    return np.greater(data, threshold).view(np.int8)
@@ -1,8 +1,11 @@
 """Test input/output"""
 
 from pathlib import Path
+import wave
 
 import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
 
 from morse_audio_decoder.io import read_wave
 
@@ -35,3 +38,36 @@ def test_read_wave_8bit(wav_file_8bit: Path):
     """8 bit conversion to numpy.uint8 data type"""
     _, data = read_wave(wav_file_8bit)
     assert data.dtype == np.uint8
+
+
+def _read_with_wave_module(file: Path) -> np.ndarray:
+    with wave.open(str(file), "rb") as wav_file:
+        buffer = wav_file.readframes(wav_file.getnframes())
+        dtype = "uint8" if wav_file.getsampwidth() == 1 else "int16"
+        return np.frombuffer(buffer, dtype=dtype)
+
+
+@pytest.mark.parametrize("file_fixture", ["wav_file", "wav_file_8bit"])
+def test_read_wave_data(file_fixture: str, request: pytest.FixtureRequest):
+    """Canonical file is memory mapped, data is equal to wave module output"""
+    file = request.getfixturevalue(file_fixture)
+    _, data = read_wave(file)
+
+    assert isinstance(data, np.memmap)
+    assert_array_equal(data, _read_with_wave_module(file))
+
+
+def test_read_wave_non_canonical(wav_file: Path, tmp_path: Path):
+    """File with extra chunk before data is read with wave module"""
+    content = wav_file.read_bytes()
+    list_chunk = b"LIST" + (4).to_bytes(4, "little") + b"INFO"
+    riff_size = (len(content) - 8 + len(list_chunk)).to_bytes(4, "little")
+    non_canonical = tmp_path / "non_canonical.wav"
+    non_canonical.write_bytes(
+        content[:4] + riff_size + content[8:36] + list_chunk + content[36:]
+    )
+
+    frame_rate, data = read_wave(non_canonical)
+
+    assert frame_rate == 44100
+    assert_array_equal(data, _read_with_wave_module(wav_file))
@@ -3,10 +3,10 @@
 from pathlib import Path
 
 import numpy as np
-from numpy.testing import assert_array_equal
+from numpy.testing import assert_array_equal, assert_array_almost_equal
 import pytest
 
-from morse_audio_decoder.morse import MorseCode
+from morse_audio_decoder.morse import MorseCode, _split_1d
 
 # pylint: disable=unused-import
 from .common_fixtures import (
@@ -74,6 +74,21 @@ def test_from_wavfile_8bit(wav_file_8bit: Path):
     assert len(received.data) > 0
 
 
+def test_from_wavfile_decode_beep(wav_file: Path):
+    """Single beep is one ON period, decoded as dash at guessed speed"""
+    morse_code = MorseCode.from_wavfile(wav_file)
+    # pylint: disable=protected-access
+    on_samples, _ = morse_code._on_off_samples()
+
+    assert len(on_samples) == 1
+    assert morse_code.decode() == "T"
+
+
+def test_from_wavfile_decode_cq(wav_file_8bit: Path):
+    """Message is decoded from 8bit file"""
+    assert MorseCode.from_wavfile(wav_file_8bit).decode() == "CQ"
+
+
 test_cases = [
     ("HELLO WORLD", ".... . .-.. .-.. ---|.-- --- .-. .-.. -.."),
     ("CQ", "-.-. --.-"),
@@ -120,19 +135,19 @@ def test_decode_empty_input():
 
 def test_morse_to_char():
     """All alphanumeric characters and full stop are in values"""
-    received = MorseCode(np.empty(1)).morse_to_char
+    received = MorseCode.morse_to_char()
     expected_chars = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ."
 
     assert set(received.values()).issuperset(expected_chars)
 
 
 def test_morse_to_char_cached(mocker):
-    """Cached dictionary is read from MorseCode._morse_to_char"""
+    """Dictionary is read from module-level _MORSE_TO_CHAR"""
     expected = {"..": "A"}
-    mocker.patch("morse_audio_decoder.morse.MorseCode._morse_to_char", expected)
+    mocker.patch("morse_audio_decoder.morse._MORSE_TO_CHAR", expected)
     morse = MorseCode(np.empty(1))
 
-    received = morse.morse_to_char
+    received = morse.morse_to_char()
 
     assert received == expected
 
@@ -168,6 +183,28 @@ def test_on_off_samples_no_padding(hello_data: np.ndarray, hello_world_morse: st
     assert_array_equal(received_off, expected_off)
 
 
+@pytest.mark.parametrize(
+    "data, expected_on", [([0, 0, 0], []), ([1, 1, 1], [3]), ([0, 1, 1], [2])]
+)
+def test_on_off_samples_without_falling_edge(data: list, expected_on: list):
+    """ON period is counted also when signal does not have both edges"""
+    # pylint: disable=protected-access
+    received_on, received_off = MorseCode(np.array(data))._on_off_samples()
+
+    assert_array_equal(received_on, expected_on)
+    assert_array_equal(received_off, [])
+
+
+def test_on_off_samples_uint8(hello_data: np.ndarray):
+    """Unsigned binary data gives same output as signed data"""
+    # pylint: disable=protected-access
+    expected_on, expected_off = MorseCode(hello_data)._on_off_samples()
+    received_on, received_off = MorseCode(hello_data.astype(np.uint8))._on_off_samples()
+
+    assert_array_equal(received_on, expected_on)
+    assert_array_equal(received_off, expected_off)
+
+
 def test_dash_dot_characters(hello_world_morse: str):
     """Sample length to dash/dot conversion"""
     dash_dots = hello_world_morse.replace(" ", "").replace("|", "")
@@ -226,3 +263,21 @@ def test_translate(hello_world_morse: str):
     expected = "HELLO WORLD"
 
     assert received == expected
+
+
+def test_split_1d():
+    """Values are split at largest gaps, labels in ascending order of centers"""
+    values = np.array([9, 1, 4, 1, 10, 4, 2])
+
+    received = _split_1d(values, 3)
+
+    assert_array_equal(received.labels, [2, 0, 1, 0, 2, 1, 0])
+    assert_array_almost_equal(received.centers, [4 / 3, 4, 9.5])
+
+
+def test_split_1d_too_few_distinct():
+    """Only distinct values form clusters"""
+    received = _split_1d(np.array([5, 5, 5]), 2)
+
+    assert_array_equal(received.labels, [0, 0, 0])
+    assert_array_equal(received.centers, [5])
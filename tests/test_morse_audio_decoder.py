@@ -1,12 +1,25 @@
 """Main tests"""
 
+import contextlib
+import io
 from pathlib import Path
 
-import numpy as np
 import pytest
 
 from morse_audio_decoder import __version__
 from morse_audio_decoder.__main__ import main, _parse_args
+from morse_audio_decoder.morse import MorseCode
+
+
+@pytest.fixture(name="morse_code_mock")
+def morse_code_mock_fx(mocker):
+    """Replace MorseCode in command line interface with autospecced mock"""
+    morse_code = mocker.create_autospec(MorseCode)
+    morse_code.from_wavfile.return_value = mocker.create_autospec(
+        MorseCode, instance=True
+    )
+    mocker.patch("morse_audio_decoder.__main__.MorseCode", morse_code)
+    return morse_code
 
 
 def test_version():
@@ -17,52 +30,45 @@ def test_version():
     assert __version__ == "0.1.1"
 
 
-def test_main(mocker, tmp_path: Path, capsys):
+def test_main(morse_code_mock, tmp_path: Path, capsys):
     """MorseCode instance is created and decode is called"""
     file_path = tmp_path / "any_file"
     file_path.touch()
 
     expected = "HELLO TEST\n"
 
-    # pylint: disable=all
-    class TestClass:
-        def __init__(self, data):
-            self.data = data
-
-        def decode(self):
-            return "HELLO TEST"
-
-        @classmethod
-        def from_wavfile(cls, file):
-            return cls(np.array([0, 1]))
-
-    mocker.patch("morse_audio_decoder.__main__.MorseCode", TestClass)
+    decode = morse_code_mock.from_wavfile.return_value.decode
+    decode.return_value = "HELLO TEST"
 
     main([str(file_path)])
     captured = capsys.readouterr()
     assert captured.out == expected
 
 
-def test_main_raises(mocker, tmp_path: Path, capsys):
-    """UserWarning causes exit with error message"""
+def test_main_text_stdout(morse_code_mock, tmp_path: Path):
+    """Output is written to redirected text stream"""
     file_path = tmp_path / "any_file"
     file_path.touch()
 
-    err_msg = "test error message"
+    decode = morse_code_mock.from_wavfile.return_value.decode
+    decode.return_value = "HELLO TEST"
 
-    # pylint: disable=all
-    class TestClass:
-        def __init__(self, data):
-            self.data = data
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        main([str(file_path)])
+
+    assert stdout.getvalue() == "HELLO TEST\n"
 
-        def decode(self):
-            raise UserWarning(err_msg)
 
-        @classmethod
-        def from_wavfile(cls, file):
-            return cls(np.array([0, 1]))
+def test_main_raises(morse_code_mock, tmp_path: Path, capsys):
+    """UserWarning causes exit with error message"""
+    file_path = tmp_path / "any_file"
+    file_path.touch()
+
+    err_msg = "test error message"
 
-    mocker.patch("morse_audio_decoder.__main__.MorseCode", TestClass)
+    decode = morse_code_mock.from_wavfile.return_value.decode
+    decode.side_effect = UserWarning(err_msg)
 
     with pytest.raises(SystemExit):
         main([str(file_path)])
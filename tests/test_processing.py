@@ -3,38 +3,70 @@
 import numpy as np
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 import pytest
+import scipy.signal
 
-from morse_audio_decoder.processing import smoothed_power, squared_signal
+from morse_audio_decoder.io import read_wave
+from morse_audio_decoder.processing import (
+    envelope_and_threshold,
+    smoothed_power,
+    smoothed_power_batch,
+    squared_signal,
+    _normalized_hanning,
+)
 
+# pylint: disable=unused-import
+from .common_fixtures import (
+    wav_file_fx,
+    wav_file_8bit_fx,
+)
 
-@pytest.fixture(name="data")
+# RMS of 1 second sine wave, smoothed with window of 4 periods
+EXPECTED_RMS_FLOAT = np.ones(44100 - 44100 // 600 * 4 + 1) / np.sqrt(2)
+EXPECTED_RMS_INT16 = (EXPECTED_RMS_FLOAT * (2**15 - 1)).astype(np.int16)
+
+
+@pytest.fixture(name="data", scope="module")
 def data_fx() -> np.ndarray:
-    """Create sample data (1 second of 600 Hz sine wave)"""
-    return (np.sin(np.linspace(0, 600 * np.pi * 2, 44100)) * (2**15 - 1)).astype(
-        np.int16
-    )
+    """Create sample data (1 second of 600 Hz sine wave)
 
+    Equal to sin(linspace(0, 600 * 2 * pi, 44100)), computed in place. The array
+    is shared by all tests in the module, so it is returned as read-only.
+    """
+    phase = np.arange(44100, dtype=np.float64)
+    phase *= 600 * np.pi * 2 / (44100 - 1)
+    wave = np.sin(phase, out=phase)
+    wave *= 2**15 - 1
+    wave = wave.astype(np.int16)
+    wave.setflags(write=False)
+    return wave
 
-@pytest.fixture(name="squared_smoothed_step")
-def squared_smoothed_step_fx() -> np.ndarray:
-    """Create squared signal out of smoothed signal from a stepwise on/off signal
+
+@pytest.fixture(name="step_data", params=[np.float64, np.int16])
+def step_data_fx(request: pytest.FixtureRequest) -> np.ndarray:
+    """Create stepwise on/off signal, as float64 and as int16 array
 
     - 1000 samples silence
     - 1000 samples sine wave
     - 1000 samples silence
-
-    Window width is 200 samples.
     """
-    step_data = np.concatenate(
+    return np.concatenate(
         (
-            np.zeros(1000),
+            np.zeros(1000, dtype=request.param),
             (
                 np.sin(np.linspace(0, 600 * np.pi * 2 / 44100 * 1000, 1000))
                 * (2**15 - 1)
             ).astype(np.int16),
-            np.zeros(1000),
+            np.zeros(1000, dtype=request.param),
         )
     )
+
+
+@pytest.fixture(name="squared_smoothed_step")
+def squared_smoothed_step_fx(step_data: np.ndarray) -> np.ndarray:
+    """Create squared signal out of smoothed signal from a stepwise on/off signal
+
+    Window width is 200 samples.
+    """
     smoothed_step_data = smoothed_power(step_data, 200, mode="same")
     return squared_signal(smoothed_step_data)
 
@@ -45,11 +77,8 @@ def test_smoothed_power_rms(data: np.ndarray):
     It will not be exactly equal, as Hann window smoothing retains some ripple
     """
     received = smoothed_power(data, 44100 // 600 * 4)
-    expected = (
-        np.ones(len(data) - 44100 // 600 * 4 + 1) / np.sqrt(2) * (2**15 - 1)
-    ).astype(np.int16)
 
-    assert_array_equal(received // 100, expected // 100)
+    assert_array_equal(received // 100, EXPECTED_RMS_INT16 // 100)
 
 
 def test_smoothed_power_rms_float():
@@ -60,9 +89,84 @@ def test_smoothed_power_rms_float():
     data = np.sin(np.linspace(0, 600 * np.pi * 2, 44100))
 
     received = smoothed_power(data, 44100 // 600 * 4)
-    expected = np.ones(len(data) - 44100 // 600 * 4 + 1) / np.sqrt(2)
 
-    assert_array_almost_equal(received, expected, 3)
+    assert_array_almost_equal(received, EXPECTED_RMS_FLOAT, 3)
+
+
+def test_smoothed_power_boxcar_rms_float():
+    """Test that RMS of sine wave is almost 1/sqrt(2) with rectangular window
+
+    Window is not integer number of periods, so some ripple remains
+    """
+    data = np.sin(np.linspace(0, 600 * np.pi * 2, 44100))
+
+    received = smoothed_power(data, 44100 // 600 * 4, window="boxcar")
+
+    assert_array_almost_equal(received, EXPECTED_RMS_FLOAT, 2)
+
+
+@pytest.mark.parametrize("window_size", [44100 // 600, 44100 // 600 + 1])
+def test_smoothed_power_boxcar_same(data, window_size):
+    """Rectangular window output is centered as in scipy.signal.convolve"""
+    expected = np.sqrt(
+        scipy.signal.convolve(
+            data.astype(np.float64) ** 2, np.ones(window_size) / window_size, "same"
+        )
+    )
+
+    received = smoothed_power(data, window_size, mode="same", window="boxcar")
+
+    assert received.size == data.size
+    assert_array_almost_equal(received / (2**15 - 1), expected / (2**15 - 1), 5)
+
+
+def test_smoothed_power_unknown_window(data):
+    """Unknown window type raises ValueError"""
+    with pytest.raises(ValueError):
+        smoothed_power(data, 44100 // 600, window="unknown")
+
+
+@pytest.mark.parametrize(
+    "mode, window", [("vaild", "hann"), ("vaild", "boxcar"), ("full", "boxcar")]
+)
+def test_smoothed_power_unknown_mode(data, mode, window):
+    """Unknown convolution mode raises ValueError, for all window types"""
+    with pytest.raises(ValueError):
+        smoothed_power(data, 44100 // 600, mode=mode, window=window)
+
+
+@pytest.mark.parametrize("window", ["hann", "boxcar"])
+@pytest.mark.parametrize("window_size", [0, -1])
+def test_smoothed_power_window_size_too_small(data, window_size, window):
+    """Window without any samples raises ValueError"""
+    with pytest.raises(ValueError):
+        smoothed_power(data, window_size, window=window)
+
+
+@pytest.mark.parametrize("window", ["hann", "boxcar"])
+@pytest.mark.parametrize("mode", ["valid", "same"])
+@pytest.mark.parametrize("window_size", [7, 8, 20])
+@pytest.mark.parametrize("data_size", [2, 3])
+def test_smoothed_power_window_longer_than_data(mode, window_size, data_size, window):
+    """Output follows scipy.signal.convolve shape and values, for all windows"""
+    short_data = np.arange(1, data_size + 1, dtype=np.float64)
+    window_values = scipy.signal.get_window(window, window_size, fftbins=False)
+    expected = np.sqrt(
+        scipy.signal.convolve(
+            short_data**2, window_values / np.sum(window_values), mode
+        )
+    )
+
+    received = smoothed_power(short_data, window_size, mode=mode, window=window)
+
+    assert_array_almost_equal(received, expected, 5)
+
+
+def test_smoothed_power_full(data):
+    """Hann window convolution is also given in "full" mode"""
+    received = smoothed_power(data, 44100 // 600, mode="full")
+
+    assert received.size == data.size + 44100 // 600 - 1
 
 
 def test_smoothed_power_uint8():
@@ -72,18 +176,15 @@ def test_smoothed_power_uint8():
     ).astype(np.uint8)
 
     received = smoothed_power(data, 44100 // 600 * 4)
-    expected = (np.ones(len(data) - 44100 // 600 * 4 + 1) / np.sqrt(2) * 128).astype(
-        np.uint8
-    )
 
-    assert_array_almost_equal(received, expected, 3)
+    assert_array_almost_equal(received, EXPECTED_RMS_FLOAT * 127.5, 0)
 
 
 def test_smoothed_power_dtype(data):
-    """Output dtype is int16 for int16 input"""
+    """Output dtype is float32 for int16 input"""
     received = smoothed_power(data, 44100 // 600)
 
-    assert received.dtype == data.dtype
+    assert received.dtype == np.float32
 
 
 def test_smoothed_power_same(data):
@@ -93,6 +194,100 @@ def test_smoothed_power_same(data):
     assert received.size == data.size
 
 
+@pytest.mark.parametrize("mode", ["valid", "same"])
+@pytest.mark.parametrize("window_size", [4, 294])
+def test_smoothed_power_direct_convolution(data, mode, window_size):
+    """Result is same as from direct convolution, for short and long windows"""
+    window = np.hanning(window_size)
+    expected = np.sqrt(
+        np.convolve(data.astype(np.float64) ** 2, window / np.sum(window), mode)
+    )
+
+    received = smoothed_power(data, window_size, mode=mode)
+
+    assert_array_almost_equal(received / (2**15 - 1), expected / (2**15 - 1), 5)
+
+
+def test_smoothed_power_strided(data):
+    """Strided view gives same result as contiguous copy"""
+    strided = np.repeat(data, 2)[::2]
+
+    received = smoothed_power(strided, 44100 // 600)
+
+    assert_array_equal(received, smoothed_power(data, 44100 // 600))
+
+
+def test_smoothed_power_out(data):
+    """Result is written to preallocated output array"""
+    out = np.empty(len(data) - 44100 // 600 + 1, dtype=np.float32)
+
+    received = smoothed_power(data, 44100 // 600, out=out)
+
+    assert received is out
+    assert_array_equal(received, smoothed_power(data, 44100 // 600))
+
+
+def test_smoothed_power_workers(data):
+    """Result does not depend on number of FFT threads"""
+    received = smoothed_power(data, 44100 // 600 * 4, workers=2)
+
+    assert_array_almost_equal(received, smoothed_power(data, 44100 // 600 * 4), 2)
+
+
+@pytest.mark.parametrize("mode", ["valid", "same"])
+@pytest.mark.parametrize("window_size", [4, 294])
+def test_smoothed_power_batch(data, mode, window_size):
+    """Each row is equal to smoothed_power output, for short and long windows"""
+    batch = np.stack((data, data[::-1], data // 2))
+
+    received = smoothed_power_batch(batch, window_size, mode=mode)
+
+    for row, signal in zip(received, batch):
+        expected = smoothed_power(signal, window_size, mode=mode)
+        assert_array_almost_equal(row / (2**15 - 1), expected / (2**15 - 1), 5)
+
+
+@pytest.mark.parametrize("mode", ["valid", "same"])
+@pytest.mark.parametrize("window_size", [7, 8, 20])
+def test_smoothed_power_batch_window_longer_than_data(mode, window_size):
+    """Batch output is same as from smoothed_power"""
+    short_data = np.arange(1, 4, dtype=np.int16)
+    expected = smoothed_power(short_data, window_size, mode=mode)
+
+    received = smoothed_power_batch(
+        np.stack((short_data, short_data)), window_size, mode=mode
+    )
+
+    assert_array_almost_equal(received[1], expected, 5)
+
+
+def test_smoothed_power_batch_unknown_mode(data):
+    """Unknown convolution mode raises ValueError"""
+    with pytest.raises(ValueError):
+        smoothed_power_batch(np.stack((data, data)), 4, mode="vaild")
+
+
+def test_smoothed_power_batch_window_size_too_small(data):
+    """Window without any samples raises ValueError"""
+    with pytest.raises(ValueError):
+        smoothed_power_batch(np.stack((data, data)), 0)
+
+
+def test_smoothed_power_batch_1d(data):
+    """1D input raises ValueError"""
+    with pytest.raises(ValueError):
+        smoothed_power_batch(data, 44100 // 600 * 4)
+
+
+def test_normalized_hanning():
+    """Window integral is 1, and cached window is returned as read-only"""
+    received = _normalized_hanning(294)
+
+    assert received is _normalized_hanning(294)
+    assert not received.flags.writeable
+    assert np.sum(received) == pytest.approx(1)
+
+
 def test_squared_signal_start(squared_smoothed_step):
     """Signal start is less than 25% window width apart from actual start"""
 
@@ -125,3 +320,58 @@ def test_squared_signal_dtype(squared_smoothed_step):
 def test_squared_signal_shape(squared_smoothed_step):
     """Test that shape is same as original"""
     assert squared_smoothed_step.shape == (3000,)
+
+
+@pytest.mark.parametrize("window", ["hann", "boxcar"])
+def test_envelope_and_threshold(step_data, window):
+    """Output is same as from smoothed_power and squared_signal, for valid mode"""
+    received = envelope_and_threshold(step_data, 200, window=window)
+    expected = squared_signal(smoothed_power(step_data, 200, window=window))
+
+    assert_array_equal(received, expected)
+
+
+@pytest.mark.parametrize("window", ["hann", "boxcar"])
+def test_envelope_and_threshold_blocks(data, window):
+    """Output does not depend on block size"""
+    expected = envelope_and_threshold(data, 44100 // 600, window=window)
+    received = envelope_and_threshold(
+        data, 44100 // 600, window=window, block_size=1000
+    )
+
+    assert_array_equal(received, expected)
+
+
+@pytest.mark.parametrize("file_fixture", ["wav_file", "wav_file_8bit"])
+def test_envelope_and_threshold_wav_file(
+    file_fixture: str, request: pytest.FixtureRequest
+):
+    """Output is same as from Hann window envelope, for decoder window size"""
+    sample_rate, wave = read_wave(request.getfixturevalue(file_fixture))
+    window_size = int(0.01 * sample_rate)
+
+    received = envelope_and_threshold(wave, window_size, block_size=10000)
+    expected = squared_signal(smoothed_power(wave, window_size))
+
+    assert_array_equal(received, expected)
+
+
+def test_envelope_and_threshold_unknown_window(data):
+    """Unknown window type raises ValueError"""
+    with pytest.raises(ValueError):
+        envelope_and_threshold(data, 44100 // 600, window="unknown")
+
+
+@pytest.mark.parametrize("window", ["hann", "boxcar"])
+@pytest.mark.parametrize("window_size", [0, -1])
+def test_envelope_and_threshold_window_size_too_small(data, window_size, window):
+    """Window without any samples raises ValueError"""
+    with pytest.raises(ValueError):
+        envelope_and_threshold(data, window_size, window=window)
+
+
+def test_envelope_and_threshold_dtype(data):
+    """Test that values are of uint8 type"""
+    received = envelope_and_threshold(data, 44100 // 600)
+
+    assert received.dtype == np.uint8